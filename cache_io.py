@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+JSON file I/O and work item helpers shared by the cache scripts.
+
+Uses orjson when it is installed and falls back to the standard json module.
+"""
+import json
+import mmap
+import os
+
+try:
+    import orjson  # optional: faster parse/serialize
+except ImportError:
+    orjson = None
+
+# Files at or above this size are mmap'd and parsed straight from the page cache
+MMAP_THRESHOLD = 10 * 1024 * 1024
+
+def loads(data):
+    """Parse JSON from bytes or str."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dumps(obj):
+    """Serialize obj to compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+def read_json(path):
+    """Parse a JSON file, mmap'ing it when it is large and orjson is available."""
+    if orjson is None:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < MMAP_THRESHOLD:
+            return orjson.loads(f.read())
+        # orjson needs a buffer, not the mmap object itself
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                return orjson.loads(view)
+
+def get_item_id(item):
+    """Return a work item's ID from its top-level 'id' or its System.Id field."""
+    item_id = item.get('id')
+    if item_id:
+        return item_id
+    fields = item.get('fields')
+    return fields.get('System.Id') if fields else None
+
+def write_json(path, obj):
+    """Write obj to path as compact JSON."""
+    with open(path, 'wb') as f:
+        f.write(dumps(obj))
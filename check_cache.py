@@ -5,9 +5,33 @@ Run this FIRST to determine if MCP fetches are needed.
 
 Usage: python check_cache.py
 """
-import json
 import os
 from config import EXPECTED_IDS, REQUIRED_FIELDS, CACHE_FILE
+from cache_io import get_item_id, read_json
+from save_to_cache import compact_cache
+
+try:
+    import ijson  # optional: streams work items instead of loading the whole cache
+except ImportError:
+    ijson = None
+
+def load_cache():
+    """Load the whole cache file."""
+    return read_json(CACHE_FILE)
+
+def iter_work_items():
+    """Yield cached work items one at a time.
+
+    With ijson installed the cache is stream-parsed; otherwise the whole
+    file is loaded and iterated.
+    """
+    if ijson is None:
+        cache = load_cache()
+        yield from cache.get('work_items', [])
+        return
+
+    with open(CACHE_FILE, 'rb') as f:
+        yield from ijson.items(f, 'work_items.item')
 
 def check_item_completeness(item):
     """Check if item has all required fields with actual content."""
@@ -37,7 +61,8 @@ def main():
     expected_set = set(EXPECTED_IDS)
     print(f"\nExpected items: {len(expected_set)}")
 
-    # Load cache
+    # Load cache (folding in any save_to_cache.py --append batches first)
+    compact_cache(quiet=True)
     if not os.path.exists(CACHE_FILE):
         print(f"\n[X] Cache file not found: {CACHE_FILE}")
         print("\nTo populate cache, use Claude Code with MCP to fetch work items.")
@@ -49,28 +74,14 @@ def main():
             print(f"  Batch {i//50 + 1}: {batch}")
         return
 
-    with open(CACHE_FILE, 'r', encoding='utf-8') as f:
-        cache = json.load(f)
-
-    items = cache.get('work_items', [])
-    cached_ids = {item.get('id') or item.get('fields', {}).get('System.Id') for item in items}
-
-    print(f"Cached items: {len(cached_ids)}")
-
-    # Check for missing IDs
-    missing_ids = sorted(expected_set - cached_ids)
-    extra_ids = sorted(cached_ids - expected_set)
-
-    print(f"Missing items: {len(missing_ids)}")
-    if extra_ids:
-        print(f"Extra items (not in expected list): {len(extra_ids)}")
-
-    # Check field completeness
+    # Single streaming pass: collect cached IDs and check field completeness
+    cached_ids = set()
     complete_items = 0
     incomplete_items = []
 
-    for item in items:
-        item_id = item.get('id') or item.get('fields', {}).get('System.Id')
+    for item in iter_work_items():
+        item_id = get_item_id(item)
+        cached_ids.add(item_id)
         if item_id not in expected_set:
             continue
 
@@ -80,6 +91,16 @@ def main():
         else:
             incomplete_items.append(item_id)
 
+    print(f"Cached items: {len(cached_ids)}")
+
+    # Check for missing IDs
+    missing_ids = sorted(expected_set - cached_ids)
+    extra_ids = sorted(cached_ids - expected_set)
+
+    print(f"Missing items: {len(missing_ids)}")
+    if extra_ids:
+        print(f"Extra items (not in expected list): {len(extra_ids)}")
+
     print(f"\nField completeness (Description or AC present):")
     print(f"  Complete: {complete_items}")
     print(f"  Incomplete: {len(incomplete_items)}")
@@ -10,18 +10,86 @@ Prerequisites:
 
 Usage: python extract_and_assess.py
 """
-import json
 import os
 import re
 import csv
+from bisect import bisect_right
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
 from datetime import datetime, timedelta
 from config import CACHE_FILE, EXPECTED_IDS
+from cache_io import get_item_id, read_json
+from save_to_cache import compact_cache
+
+try:
+    import ijson  # optional: streams work items instead of loading the whole cache
+except ImportError:
+    ijson = None
 
 OUTPUT_DIR = os.path.dirname(os.path.abspath(__file__))
 
-def get_expected_ids(cache):
+# Runs with at least this many tickets are assessed across a process pool,
+# one batch at a time, when there is more than one CPU; smaller runs and
+# single-CPU machines stay in-process (pool startup and pickling cost more)
+PARALLEL_BATCH_SIZE = 1000
+
+# CSV report columns; report rows are written as tuples in this order
+FIELDNAMES = ['ID', 'Work Item Type', 'Title', 'State', 'Created By',
+              'Start Date', 'Target Date', 'Grade', 'Score', 'Rationale']
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_WS_RE = re.compile(r'\s+')
+
+# Keyword bags for assess_ticket - matched as substrings of the lowercased text
+ACTION_WORDS = ('create', 'update', 'delete', 'validate', 'display', 'send', 'receive',
+                'process', 'generate', 'implement', 'add', 'remove', 'modify', 'enable',
+                'configure', 'support', 'allow', 'provide', 'ensure', 'verify')
+DETAIL_INDICATORS = ('field', 'button', 'screen', 'page', 'api', 'database', 'table',
+                     'column', 'report', 'email', 'notification', 'validation', 'rule')
+ACTOR_TERMS = ('user', 'admin', 'staff', 'inspector', 'customer', 'agent')
+WHY_TERMS = ('improve', 'enable', 'allow', 'support', 'ensure')
+EDGE_TERMS = ('error', 'exception', 'invalid', 'boundary', 'edge case', 'fail')
+STRONG_ACTOR_TERMS = ('as a ', 'as an ')
+STRONG_WHY_TERMS = ('so that', 'in order to')
+AC_GWT_TERMS = ('given', 'when', 'then')
+AC_MODAL_TERMS = ('should', 'must', 'verify', 'confirm', 'ensure')
+
+# Tiered score bands as (ascending thresholds, points) - a value earns the
+# points of the highest threshold it meets, or points[0] if it meets none
+ACTION_BANDS = ((1, 2, 4), (0, 5, 9, 13))
+DETAIL_BANDS = ((1, 2, 4), (3, 7, 12, 17))
+DESC_BANDS = ((10, 25, 50, 75), (0, 4, 7, 10, 12))
+AC_BANDS = ((15, 20, 40, 75), (0, 4, 7, 10, 13))
+GRADE_BANDS = ((20, 35, 55, 75), ('F', 'D', 'C', 'B', 'A'))
+GRADE_ORDER = {'A': 5, 'B': 4, 'C': 3, 'D': 2, 'F': 1}
+
+def load_cache():
+    """Load the whole cache file."""
+    return read_json(CACHE_FILE)
+
+def open_cache():
+    """Return (metadata, work_items) for the cache file.
+
+    With ijson installed, work items are yielded one at a time so peak memory
+    stays proportional to a single item; otherwise the whole file is loaded
+    and work_items is a list.
+    """
+    if ijson is None:
+        cache = load_cache()
+        return cache.get('metadata', {}), cache.get('work_items', [])
+
+    with open(CACHE_FILE, 'rb') as f:
+        metadata = next(ijson.items(f, 'metadata'), {})
+    return metadata, _stream_work_items()
+
+def _stream_work_items():
+    """Yield cached work items one at a time (requires ijson)."""
+    with open(CACHE_FILE, 'rb') as f:
+        yield from ijson.items(f, 'work_items.item')
+
+def get_expected_ids(metadata):
     """Get expected IDs from cache metadata, fall back to config if not available."""
-    metadata = cache.get('metadata', {})
     if 'expected_ids' in metadata:
         return set(metadata['expected_ids'])
     # Fall back to hardcoded list
@@ -31,16 +99,18 @@ def strip_html(text):
     """Remove HTML tags from text."""
     if not text:
         return ""
-    clean = re.sub(r'<[^>]+>', ' ', str(text))
-    clean = re.sub(r'\\s+', ' ', clean)
-    return clean.strip()
+    return _WS_RE.sub(' ', _TAG_RE.sub(' ', str(text))).strip()
 
 def count_words(text):
-    """Count words in text."""
+    """Count words in whitespace-normalized text (as returned by strip_html)."""
     if not text:
         return 0
-    words = text.split()
-    return len(words)
+    return text.count(' ') + 1
+
+def band(value, bands):
+    """Look up the tiered score (or grade) for value in a (thresholds, points) band table."""
+    thresholds, points = bands
+    return points[bisect_right(thresholds, value)]
 
 def parse_date(date_str):
     """Parse ISO date string to datetime."""
@@ -52,95 +122,83 @@ def parse_date(date_str):
         return None
 
 def extract_fields(item):
-    """Extract relevant fields from a work item."""
+    """Extract relevant fields from a work item.
+
+    Also caches the derived values assess_ticket needs (word counts and the
+    parsed naive start date) under '_'-prefixed keys so they are computed once.
+    """
     fields = item.get('fields', {})
+    title = fields.get('System.Title', '')
+    desc = strip_html(fields.get('System.Description', ''))
+    ac = strip_html(fields.get('Microsoft.VSTS.Common.AcceptanceCriteria', ''))
+    start_date = fields.get('Microsoft.VSTS.Scheduling.StartDate', '')
+    start_dt = parse_date(start_date)
+    created_by = fields.get('System.CreatedBy', '')
+    if isinstance(created_by, dict):
+        created_by = created_by.get('displayName', str(created_by))
     return {
         'id': fields.get('System.Id', item.get('id', '')),
         'type': fields.get('System.WorkItemType', ''),
-        'title': fields.get('System.Title', ''),
-        'description': strip_html(fields.get('System.Description', '')),
-        'acceptance_criteria': strip_html(fields.get('Microsoft.VSTS.Common.AcceptanceCriteria', '')),
-        'created_by': fields.get('System.CreatedBy', ''),
+        'title': title,
+        'description': desc,
+        'acceptance_criteria': ac,
+        'created_by': created_by,
         'state': fields.get('System.State', ''),
         'area_path': fields.get('System.AreaPath', ''),
-        'start_date': fields.get('Microsoft.VSTS.Scheduling.StartDate', ''),
-        'target_date': fields.get('Microsoft.VSTS.Scheduling.TargetDate', '')
+        'start_date': start_date,
+        'target_date': fields.get('Microsoft.VSTS.Scheduling.TargetDate', ''),
+        '_desc_words': count_words(desc),
+        '_ac_words': count_words(ac),
+        '_start_dt': start_dt.replace(tzinfo=None) if start_dt else None
     }
 
-def assess_ticket(ticket):
-    """Assess a single ticket and return grade, score, rationale."""
-    desc = ticket['description']
-    ac = ticket['acceptance_criteria']
-    title = ticket['title']
-
-    desc_words = count_words(desc)
-    ac_words = count_words(ac)
+def score_ticket(desc_words, ac_words, action_count, detail_count, has_strong_actor, has_actor,
+                 has_strong_why, has_why, ac_has_gwt, ac_has_modal, has_edge):
+    """Score precomputed ticket features and return (grade, total_score).
 
+    Pure integer/boolean arithmetic - all text scanning happens in assess_ticket.
+    """
     # Check for critical caps
     cap_grade = None
-    cap_reason = ""
 
     if ac_words < 15 and desc_words < 10:
-        cap_grade = 'F'
-        cap_reason = "Both empty"
+        cap_grade = 'F'  # Both empty
     elif desc_words < 10:
-        cap_grade = 'D'
-        cap_reason = "Empty Desc"
+        cap_grade = 'D'  # Empty Desc
     elif ac_words < 15:
-        cap_grade = 'C'
-        cap_reason = "Empty AC"
+        cap_grade = 'C'  # Empty AC
 
     # Qualitative scoring (75 points)
     qual_score = 0
 
     # WHAT - Actions (15 pts)
-    action_words = ['create', 'update', 'delete', 'validate', 'display', 'send', 'receive',
-                    'process', 'generate', 'implement', 'add', 'remove', 'modify', 'enable',
-                    'configure', 'support', 'allow', 'provide', 'ensure', 'verify']
-    combined = (desc + " " + ac + " " + title).lower()
-    action_count = sum(1 for w in action_words if w in combined)
-    if action_count >= 4:
-        qual_score += 13
-    elif action_count >= 2:
-        qual_score += 9
-    elif action_count >= 1:
-        qual_score += 5
+    qual_score += band(action_count, ACTION_BANDS)
 
     # WHO - Actor (10 pts)
-    if 'as a ' in combined or 'as an ' in combined:
+    if has_strong_actor:
         qual_score += 9
-    elif any(x in combined for x in ['user', 'admin', 'staff', 'inspector', 'customer', 'agent']):
+    elif has_actor:
         qual_score += 6
     else:
         qual_score += 2
 
     # WHY - Business Context (10 pts)
-    if 'so that' in combined or 'in order to' in combined:
+    if has_strong_why:
         qual_score += 9
-    elif 'to ' in combined and any(x in combined for x in ['improve', 'enable', 'allow', 'support', 'ensure']):
+    elif has_why:
         qual_score += 6
     else:
         qual_score += 2
 
     # HOW - Implementation Clarity (20 pts)
-    detail_indicators = ['field', 'button', 'screen', 'page', 'api', 'database', 'table',
-                        'column', 'report', 'email', 'notification', 'validation', 'rule']
-    detail_count = sum(1 for w in detail_indicators if w in combined)
-    if detail_count >= 4:
-        qual_score += 17
-    elif detail_count >= 2:
-        qual_score += 12
-    elif detail_count >= 1:
-        qual_score += 7
-    else:
-        qual_score += 3
+    qual_score += band(detail_count, DETAIL_BANDS)
 
     # DONE - Testable Criteria (15 pts)
     if ac_words == 0:
         qual_score += 0
-    elif 'given' in ac.lower() or 'when' in ac.lower() or 'then' in ac.lower():
+    elif ac_has_gwt:
         qual_score += 13
-    elif any(x in ac.lower() for x in ['should', 'must', 'verify', 'confirm', 'ensure']):
+    elif ac_has_modal:
         qual_score += 9
     elif ac_words >= 15:
         qual_score += 5
@@ -148,7 +206,7 @@ def assess_ticket(ticket):
         qual_score += 2
 
     # EDGE - Exception Handling (5 pts)
-    if any(x in combined for x in ['error', 'exception', 'invalid', 'boundary', 'edge case', 'fail']):
+    if has_edge:
         qual_score += 4
     else:
         qual_score += 1
@@ -157,50 +215,59 @@ def assess_ticket(ticket):
     quant_score = 0
 
     # Description substance (12 pts)
-    if desc_words >= 75:
-        quant_score += 12
-    elif desc_words >= 50:
-        quant_score += 10
-    elif desc_words >= 25:
-        quant_score += 7
-    elif desc_words >= 10:
-        quant_score += 4
+    quant_score += band(desc_words, DESC_BANDS)
 
     # AC substance (13 pts)
-    if ac_words >= 75:
-        quant_score += 13
-    elif ac_words >= 40:
-        quant_score += 10
-    elif ac_words >= 20:
-        quant_score += 7
-    elif ac_words >= 15:
-        quant_score += 4
+    quant_score += band(ac_words, AC_BANDS)
 
     # Total score
     total_score = qual_score + quant_score
 
     # Determine grade
-    if total_score >= 75:
-        grade = 'A'
-    elif total_score >= 55:
-        grade = 'B'
-    elif total_score >= 35:
-        grade = 'C'
-    elif total_score >= 20:
-        grade = 'D'
-    else:
-        grade = 'F'
+    grade = band(total_score, GRADE_BANDS)
 
     # Apply cap
-    grade_order = {'A': 5, 'B': 4, 'C': 3, 'D': 2, 'F': 1}
-    if cap_grade and grade_order.get(grade, 0) > grade_order.get(cap_grade, 0):
+    if cap_grade and GRADE_ORDER[grade] > GRADE_ORDER[cap_grade]:
         grade = cap_grade
 
+    return grade, total_score
+
+def apply_prelim(grade, start_dt, now):
+    """Mark the grade as Prelim if the ticket starts more than 7 days after now."""
+    if start_dt and (start_dt - now).days > 7:
+        return f"Prelim: {grade}"
+    return grade
+
+def assess_ticket(ticket, now):
+    """Assess a single ticket and return grade, score, rationale.
+
+    now is the naive datetime the prelim check measures start dates against.
+    """
+    desc_words = ticket['_desc_words']
+    ac_words = ticket['_ac_words']
+
+    # Keyword counts and flags - substring probes over the keyword bags
+    # Lowercased here rather than in extract_fields so the pool doesn't pickle them
+    ac = ticket['acceptance_criteria']
+    ac_lower = ac.lower()
+    combined = (ticket['description'] + " " + ac + " " + ticket['title']).lower()
+    action_count = sum(w in combined for w in ACTION_WORDS)
+
+    grade, total_score = score_ticket(
+        desc_words, ac_words,
+        action_count,
+        sum(w in combined for w in DETAIL_INDICATORS),
+        any(w in combined for w in STRONG_ACTOR_TERMS),
+        any(w in combined for w in ACTOR_TERMS),
+        any(w in combined for w in STRONG_WHY_TERMS),
+        'to ' in combined and any(w in combined for w in WHY_TERMS),
+        any(w in ac_lower for w in AC_GWT_TERMS),
+        any(w in ac_lower for w in AC_MODAL_TERMS),
+        any(w in combined for w in EDGE_TERMS),
+    )
+
     # Check for prelim
-    start_date = parse_date(ticket['start_date'])
-    today = datetime.now(start_date.tzinfo if start_date and start_date.tzinfo else None) if start_date else datetime.now()
-    if start_date and (start_date.replace(tzinfo=None) - datetime.now()).days > 7:
-        grade = f"Prelim: {grade}"
+    grade = apply_prelim(grade, ticket['_start_dt'], now)
 
     # Build rationale
     rationale_parts = []
@@ -229,12 +296,28 @@ def assess_ticket(ticket):
 
     return grade, total_score, rationale
 
+def iter_assessed(tickets, now):
+    """Yield (ticket, (grade, score, rationale)) for each ticket in a stream."""
+    batch = list(islice(tickets, PARALLEL_BATCH_SIZE))
+    if len(batch) < PARALLEL_BATCH_SIZE or (os.cpu_count() or 1) < 2:
+        for ticket in batch:
+            yield ticket, assess_ticket(ticket, now)
+        for ticket in tickets:
+            yield ticket, assess_ticket(ticket, now)
+        return
+
+    with ProcessPoolExecutor() as executor:
+        while batch:
+            yield from zip(batch, executor.map(assess_ticket, batch, repeat(now), chunksize=64))
+            batch = list(islice(tickets, PARALLEL_BATCH_SIZE))
+
 def main():
     print("=" * 60)
     print("ADO Ticket Quality Assessment (Local Cache)")
     print("=" * 60)
 
-    # Check cache exists
+    # Fold in any save_to_cache.py --append batches, then check cache exists
+    compact_cache(quiet=True)
     if not os.path.exists(CACHE_FILE):
         print(f"\n*** ERROR: Cache file not found ***")
         print(f"File: {CACHE_FILE}")
@@ -243,86 +326,113 @@ def main():
 
     # Load cache
     print("\nLoading from local cache...")
-    with open(CACHE_FILE, 'r', encoding='utf-8') as f:
-        cache = json.load(f)
-
-    items = cache.get('work_items', [])
-    metadata = cache.get('metadata', {})
+    metadata, work_items = open_cache()
+    streamed = not isinstance(work_items, list)
 
     print(f"  Last updated: {metadata.get('last_updated', 'Unknown')}")
-    print(f"  Total items in cache: {len(items)}")
+    if not streamed:
+        print(f"  Total items in cache: {len(work_items)}")
 
     # Get expected IDs (from cache metadata or fallback to config)
-    expected_set = get_expected_ids(cache)
+    expected_set = get_expected_ids(metadata)
     source = "cache metadata" if 'expected_ids' in metadata else "config.py (static)"
     print(f"  Expected IDs source: {source}")
     print(f"  Expected IDs count: {len(expected_set)}")
 
-    # Filter to expected IDs only
-    items = [item for item in items if (item.get('id') or item.get('fields', {}).get('System.Id')) in expected_set]
-    print(f"  Items matching expected IDs: {len(items)}")
-
-    if len(items) < len(expected_set):
-        missing = len(expected_set) - len(items)
-        print(f"\n*** WARNING: {missing} expected items not in cache ***")
-        print("Run check_cache.py to see missing IDs.")
-
-    # Extract fields and assess
-    print("\nAssessing tickets...")
-    tickets = [extract_fields(item) for item in items]
+    # Filter to expected IDs only - up front when the cache is already in
+    # memory, otherwise while streaming (the counts are printed afterwards)
+    total_items = 0
 
-    results = []
-    grade_counts = {'A': 0, 'B': 0, 'C': 0, 'D': 0, 'F': 0}
-    prelim_count = 0
+    def expected_items():
+        nonlocal total_items
+        for item in work_items:
+            total_items += 1
+            if get_item_id(item) in expected_set:
+                yield item
 
-    for ticket in tickets:
-        grade, score, rationale = assess_ticket(ticket)
-
-        # Parse creator name
-        created_by = str(ticket['created_by'])
-        if isinstance(ticket['created_by'], dict):
-            created_by = ticket['created_by'].get('displayName', str(ticket['created_by']))
-        if '<' in created_by:
-            created_by = created_by.split('<')[0].strip()
-
-        # Format dates
-        start_date = ticket['start_date'][:10] if ticket['start_date'] else ''
-        target_date = ticket['target_date'][:10] if ticket['target_date'] else ''
-
-        results.append({
-            'ID': ticket['id'],
-            'Work Item Type': ticket['type'],
-            'Title': ticket['title'][:100] + '...' if len(ticket['title']) > 100 else ticket['title'],
-            'State': ticket['state'],
-            'Created By': created_by,
-            'Start Date': start_date,
-            'Target Date': target_date,
-            'Grade': grade,
-            'Score': score,
-            'Rationale': rationale
-        })
-
-        # Count grades
-        base_grade = grade.replace('Prelim: ', '')
-        grade_counts[base_grade] = grade_counts.get(base_grade, 0) + 1
-        if 'Prelim' in grade:
-            prelim_count += 1
+    if streamed:
+        items = expected_items()
+    else:
+        items = list(expected_items())
+        print(f"  Items matching expected IDs: {len(items)}")
 
     # Generate timestamp
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-
-    # Write CSV report
     csv_file = os.path.join(OUTPUT_DIR, f"Q12026_Features_quality_report_{timestamp}.csv")
+
+    # Stream items straight through extraction and assessment and write each
+    # CSV row as soon as it is graded.
+    # Only the summary aggregates are kept in memory.
+    print("\nAssessing tickets...")
+    total = 0
+    grade_counts = {'A': 0, 'B': 0, 'C': 0, 'D': 0, 'F': 0}
+    prelim_count = 0
+    now = datetime.now()
+    risk_counts = {'F': 0, 'D': 0}
+    risk_examples = {'F': [], 'D': []}  # first 10 (ID, title) per imminent grade
+    creator_issues = defaultdict(lambda: {'F': [], 'D': []})
+
     with open(csv_file, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=['ID', 'Work Item Type', 'Title', 'State', 'Created By',
-                                                'Start Date', 'Target Date', 'Grade', 'Score', 'Rationale'])
-        writer.writeheader()
-        writer.writerows(results)
+        writer = csv.writer(f)
+        writer.writerow(FIELDNAMES)
+
+        for ticket, (grade, score, rationale) in iter_assessed(map(extract_fields, items), now):
+            # Parse creator name ("Name <email>" -> "Name")
+            created_by = str(ticket['created_by'])
+            if '<' in created_by:
+                created_by = created_by.partition('<')[0].strip()
+
+            # Format dates
+            start_date = ticket['start_date'][:10] if ticket['start_date'] else ''
+            target_date = ticket['target_date'][:10] if ticket['target_date'] else ''
+
+            title = ticket['title']
+            if len(title) > 100:
+                title = title[:100] + '...'
+
+            writer.writerow((
+                ticket['id'],
+                ticket['type'],
+                title,
+                ticket['state'],
+                created_by,
+                start_date,
+                target_date,
+                grade,
+                score,
+                rationale
+            ))
+            total += 1
+
+            # Count grades
+            base_grade = grade.replace('Prelim: ', '')
+            grade_counts[base_grade] = grade_counts.get(base_grade, 0) + 1
+            if 'Prelim' in grade:
+                prelim_count += 1
+
+            # Risk assessment (imminent F/D only)
+            if grade in risk_counts:
+                risk_counts[grade] += 1
+                if len(risk_examples[grade]) < 10:
+                    risk_examples[grade].append((ticket['id'], title))
+
+            # Action by creator (F/D, including prelim)
+            if base_grade in ('F', 'D'):
+                creator = created_by or "(Unknown)"
+                creator_issues[creator][base_grade].append(str(ticket['id']))
+
+    if streamed:
+        print(f"  Total items in cache: {total_items}")
+        print(f"  Items matching expected IDs: {total}")
+
+    if total < len(expected_set):
+        missing = len(expected_set) - total
+        print(f"\n*** WARNING: {missing} expected items not in cache ***")
+        print("Run check_cache.py to see missing IDs.")
 
     print(f"\nCSV report saved: {csv_file}")
 
     # Generate summary
-    total = len(results)
     summary = []
     summary.append("=" * 80)
     summary.append("TICKET QUALITY ASSESSMENT REPORT")
@@ -349,35 +459,20 @@ def main():
     summary.append("RISK ASSESSMENT")
     summary.append("-" * 40)
 
-    f_imminent = [r for r in results if r['Grade'] == 'F']
-    d_imminent = [r for r in results if r['Grade'] == 'D']
-
-    summary.append(f"F-grade imminent (IMMEDIATE RISK): {len(f_imminent)}")
-    for r in f_imminent[:10]:
-        summary.append(f"  {r['ID']}: {r['Title'][:60]}...")
+    summary.append(f"F-grade imminent (IMMEDIATE RISK): {risk_counts['F']}")
+    for item_id, title in risk_examples['F']:
+        summary.append(f"  {item_id}: {title[:60]}...")
 
     summary.append("")
-    summary.append(f"D-grade imminent (HIGH RISK): {len(d_imminent)}")
-    for r in d_imminent[:10]:
-        summary.append(f"  {r['ID']}: {r['Title'][:60]}...")
+    summary.append(f"D-grade imminent (HIGH RISK): {risk_counts['D']}")
+    for item_id, title in risk_examples['D']:
+        summary.append(f"  {item_id}: {title[:60]}...")
 
     # Action by creator
     summary.append("")
     summary.append("ACTION REQUIRED BY CREATOR")
     summary.append("-" * 40)
 
-    creator_issues = {}
-    for r in results:
-        if r['Grade'] in ['F', 'D'] or r['Grade'].endswith('F') or r['Grade'].endswith('D'):
-            creator = r['Created By']
-            if not creator:
-                creator = "(Unknown)"
-            if creator not in creator_issues:
-                creator_issues[creator] = {'F': [], 'D': []}
-            base_grade = r['Grade'].replace('Prelim: ', '')
-            if base_grade in creator_issues[creator]:
-                creator_issues[creator][base_grade].append(str(r['ID']))
-
     for creator, issues in sorted(creator_issues.items()):
         if issues['F'] or issues['D']:
             summary.append(f"\n{creator}:")
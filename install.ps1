@@ -67,6 +67,8 @@ Write-Host "[3/5] Copying files..." -ForegroundColor Yellow
 
 $filesToCopy = @(
     @{ Name = "config.py"; Dest = $ProjectPath },
+    @{ Name = "cache_io.py"; Dest = $ProjectPath },
+    @{ Name = "pretty_cache.py"; Dest = $ProjectPath },
     @{ Name = "check_cache.py"; Dest = $ProjectPath },
     @{ Name = "save_to_cache.py"; Dest = $ProjectPath },
     @{ Name = "sync_cache.py"; Dest = $ProjectPath },
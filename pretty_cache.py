@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Pretty-print the local cache for humans.
+
+save_to_cache.py and sync_cache.py write the cache as compact JSON; this
+rewrites it (or a copy) indented. The next save compacts it again.
+
+Usage:
+    python pretty_cache.py                  # Rewrite CACHE_FILE indented
+    python pretty_cache.py <output.json>    # Write an indented copy instead
+"""
+import json
+import os
+import sys
+from config import CACHE_FILE
+from cache_io import read_json
+
+def main():
+    if not os.path.exists(CACHE_FILE):
+        print(f"Cache file not found: {CACHE_FILE}")
+        sys.exit(1)
+
+    output_file = sys.argv[1] if len(sys.argv) > 1 else CACHE_FILE
+
+    cache = read_json(CACHE_FILE)
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2)
+
+    print(f"Wrote indented cache: {output_file}")
+
+if __name__ == "__main__":
+    main()
@@ -17,30 +17,36 @@ To sync with ADO first (outputs MCP commands if needed):
 Usage in Claude Code:
     "Run the ticket quality assessment and sync with ADO if needed"
 """
-import json
 import os
 import sys
 import subprocess
 from datetime import datetime
 from config import CACHE_FILE, ADO_QUERIES, ADO_PROJECT, REQUIRED_FIELDS
+from cache_io import get_item_id, read_json
+from save_to_cache import compact_cache
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 def load_cache():
     """Load existing cache."""
     if os.path.exists(CACHE_FILE):
-        with open(CACHE_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return read_json(CACHE_FILE)
     return {"metadata": {}, "work_items": []}
 
-def get_cached_ids(cache):
-    """Get set of IDs currently in cache."""
+def index_cached_ids(cache):
+    """Build the frozenset of IDs in cache['work_items']."""
     ids = set()
     for item in cache.get('work_items', []):
-        item_id = item.get('id') or item.get('fields', {}).get('System.Id')
+        item_id = get_item_id(item)
         if item_id:
             ids.add(int(item_id))
-    return ids
+    return frozenset(ids)
+
+def get_cached_ids(cache):
+    """Get set of IDs currently in cache (indexed once, in memory only)."""
+    if '_cached_ids' not in cache:
+        cache['_cached_ids'] = index_cached_ids(cache)
+    return cache['_cached_ids']
 
 def run_assessment():
     """Run the quality assessment."""
@@ -91,6 +97,7 @@ def main():
     print("ADO Ticket Quality Assessment - Self-Updating Runner")
     print("=" * 60)
 
+    compact_cache(quiet=True)
     cache = load_cache()
     metadata = cache.get('metadata', {})
 
@@ -101,8 +108,7 @@ def main():
         print("\nOr provide query IDs file: python run_assessment.py --query-ids <file>")
 
         if args.query_ids and os.path.exists(args.query_ids):
-            with open(args.query_ids, 'r') as f:
-                query_ids = json.load(f)
+            query_ids = read_json(args.query_ids)
             if isinstance(query_ids, dict):
                 query_ids = query_ids.get('ids', [])
             print_sync_instructions(query_ids, cache)
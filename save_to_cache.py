@@ -8,45 +8,70 @@ Usage (from Claude Code):
 2. Call this script with the JSON data piped in or as a file
 
 Can also be used to merge multiple JSON files into the cache.
+
+For many small batches, append them to the JSON Lines journal instead of
+rewriting the whole cache each time, then fold the journal in once:
+    python save_to_cache.py --append <response.json>
+    python save_to_cache.py --compact
+Input may be a JSON document or JSON Lines (one work item per line).
 """
 import json
 import os
 import sys
 from datetime import datetime
 from config import CACHE_FILE, REQUIRED_FIELDS
+from cache_io import dumps, get_item_id, loads, read_json, write_json
+
+JOURNAL_FILE = CACHE_FILE + '.jsonl'
 
 def load_cache():
     """Load existing cache or create empty one."""
     if os.path.exists(CACHE_FILE):
-        with open(CACHE_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return read_json(CACHE_FILE)
     return {"metadata": {}, "work_items": []}
 
-def save_cache(cache):
-    """Save cache to file."""
+def index_cache(cache):
+    """Return the cache's work items indexed by ID, building the index once.
+
+    The index lives in cache['_by_id'] for the rest of the run; save_cache
+    turns it back into the persisted work_items list.
+    """
+    if '_by_id' not in cache:
+        by_id = {}
+        for item in cache.get('work_items', []):
+            item_id = get_item_id(item)
+            if item_id:
+                by_id[item_id] = item
+        cache['_by_id'] = by_id
+    return cache['_by_id']
+
+def save_cache(cache, quiet=False):
+    """Save cache to file as compact JSON (see pretty_cache.py for a readable copy)."""
+    by_id = cache.pop('_by_id', None)
+    if by_id is not None:
+        cache['work_items'] = list(by_id.values())
+
     cache['metadata']['last_updated'] = datetime.now().isoformat()
     cache['metadata']['total_items'] = len(cache['work_items'])
 
-    with open(CACHE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(cache, f, indent=2)
+    write_json(CACHE_FILE, cache)
 
-    print(f"Cache saved: {len(cache['work_items'])} items")
-    print(f"File: {CACHE_FILE}")
+    if not quiet:
+        print(f"Cache saved: {len(cache['work_items'])} items")
+        print(f"File: {CACHE_FILE}")
 
 def add_items_to_cache(new_items, cache):
-    """Add or update items in cache, merging fields for completeness."""
-    # Index existing items by ID
-    existing = {}
-    for item in cache.get('work_items', []):
-        item_id = item.get('id') or item.get('fields', {}).get('System.Id')
-        if item_id:
-            existing[item_id] = item
+    """Add or update items in cache, merging fields for completeness.
+
+    Updates the in-memory ID index only; call save_cache to persist.
+    """
+    existing = index_cache(cache)
 
     # Add/update with new items
     added = 0
     updated = 0
     for item in new_items:
-        item_id = item.get('id') or item.get('fields', {}).get('System.Id')
+        item_id = get_item_id(item)
         if not item_id:
             continue
 
@@ -56,10 +81,11 @@ def add_items_to_cache(new_items, cache):
             new_fields = item.get('fields', {})
 
             merged_fields = dict(old_fields)  # Start with old fields
+            mf_get = merged_fields.get
 
             # For each new field, use it if old is missing/empty or new is longer
             for key, new_value in new_fields.items():
-                old_value = merged_fields.get(key)
+                old_value = mf_get(key)
                 # Use new value if old is missing, empty, or new is more substantial
                 if old_value is None or old_value == '':
                     merged_fields[key] = new_value
@@ -74,23 +100,80 @@ def add_items_to_cache(new_items, cache):
             existing[item_id] = item
             added += 1
 
-    cache['work_items'] = list(existing.values())
     return added, updated
 
+def append_items(items):
+    """Append items to the JSON Lines journal, one item per line."""
+    with open(JOURNAL_FILE, 'ab') as f:
+        for item in items:
+            f.write(dumps(item) + b'\n')
+
+    print(f"Appended: {len(items)} items")
+    print(f"Journal: {JOURNAL_FILE}")
+
+def compact_cache(quiet=False):
+    """Merge the journal into the cache, save it, and remove the journal.
+
+    Every script that reads the cache calls this first (quiet=True), so
+    appended batches are never missed. Exits if a journal line is invalid.
+    """
+    if not os.path.exists(JOURNAL_FILE):
+        if not quiet:
+            print("No journal to compact")
+        return
+
+    items = []
+    with open(JOURNAL_FILE, 'rb') as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                items.append(loads(line))
+            except ValueError as e:
+                print(f"ERROR: {JOURNAL_FILE} line {line_no} is not valid JSON: {e}", file=sys.stderr)
+                print("Fix or remove that line, then run: python save_to_cache.py --compact", file=sys.stderr)
+                sys.exit(1)
+
+    cache = load_cache()
+    added, updated = add_items_to_cache(items, cache)
+
+    if not quiet:
+        print(f"Compacted {len(items)} journal items")
+        print(f"Added: {added}, Updated: {updated}")
+    save_cache(cache, quiet=quiet)
+    os.remove(JOURNAL_FILE)
+
+def parse_input(text):
+    """Parse a JSON document, falling back to JSON Lines."""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        lines = [line for line in text.splitlines() if line.strip()]
+        if len(lines) < 2:
+            raise
+        return [json.loads(line) for line in lines]
+
 def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    append = '--append' in sys.argv[1:]
+
+    if '--compact' in sys.argv[1:]:
+        compact_cache()
+        return
+
     # Check for input file argument
-    if len(sys.argv) > 1:
-        input_file = sys.argv[1]
+    if args:
+        input_file = args[0]
         if os.path.exists(input_file):
             with open(input_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+                data = parse_input(f.read())
         else:
             print(f"File not found: {input_file}")
             sys.exit(1)
     else:
         # Read from stdin
         print("Reading JSON from stdin...")
-        data = json.load(sys.stdin)
+        data = parse_input(sys.stdin.read())
 
     # Handle different input formats
     if isinstance(data, list):
@@ -106,6 +189,10 @@ def main():
         print("No items found in input")
         sys.exit(1)
 
+    if append:
+        append_items(items)
+        return
+
     print(f"Processing {len(items)} items...")
 
     # Load and update cache
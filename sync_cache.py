@@ -16,30 +16,59 @@ import sys
 import argparse
 from datetime import datetime
 from config import CACHE_FILE, REQUIRED_FIELDS, ADO_PROJECT
+from cache_io import get_item_id, read_json, write_json
+from save_to_cache import compact_cache
+
+try:
+    import ijson  # optional: streams IDs out of large query result files
+except ImportError:
+    ijson = None
+
+def read_ids(path):
+    """Read query IDs from a JSON list or an object with an 'ids' list.
+
+    With ijson installed the IDs are streamed out of the file without
+    building the rest of the document.
+    """
+    if ijson is None:
+        data = read_json(path)
+        return data if isinstance(data, list) else data.get('ids', [])
+
+    with open(path, 'rb') as f:
+        first = f.read(1)
+        while first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        return list(ijson.items(f, 'item' if first == b'[' else 'ids.item'))
 
 def load_cache():
     """Load existing cache or create empty one."""
     if os.path.exists(CACHE_FILE):
-        with open(CACHE_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return read_json(CACHE_FILE)
     return {"metadata": {}, "work_items": []}
 
 def save_cache(cache):
-    """Save cache to file."""
+    """Save cache to file as compact JSON (see pretty_cache.py for a readable copy)."""
+    cache.pop('_cached_ids', None)
     cache['metadata']['last_updated'] = datetime.now().isoformat()
     cache['metadata']['total_items'] = len(cache['work_items'])
 
-    with open(CACHE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(cache, f, indent=2)
+    write_json(CACHE_FILE, cache)
 
-def get_cached_ids(cache):
-    """Get set of IDs currently in cache."""
+def index_cached_ids(cache):
+    """Build the frozenset of IDs in cache['work_items']."""
     ids = set()
     for item in cache.get('work_items', []):
-        item_id = item.get('id') or item.get('fields', {}).get('System.Id')
+        item_id = get_item_id(item)
         if item_id:
             ids.add(int(item_id))
-    return ids
+    return frozenset(ids)
+
+def get_cached_ids(cache):
+    """Get set of IDs currently in cache (indexed once, in memory only)."""
+    if '_cached_ids' not in cache:
+        cache['_cached_ids'] = index_cached_ids(cache)
+    return cache['_cached_ids']
 
 def check_completeness(item):
     """Check if item has Description or AcceptanceCriteria."""
@@ -48,9 +77,10 @@ def check_completeness(item):
     ac = fields.get('Microsoft.VSTS.Common.AcceptanceCriteria', '')
     return bool(desc) or bool(ac)
 
-def check_sync_status(query_ids):
-    """Compare query IDs with cache and return sync status."""
-    cache = load_cache()
+def check_sync_status(query_ids, cache=None):
+    """Compare query IDs with cache (loaded if not given) and return sync status."""
+    if cache is None:
+        cache = load_cache()
     cached_ids = get_cached_ids(cache)
     query_id_set = set(query_ids)
 
@@ -62,7 +92,7 @@ def check_sync_status(query_ids):
     # Check completeness of cached items
     incomplete_ids = []
     for item in cache.get('work_items', []):
-        item_id = item.get('id') or item.get('fields', {}).get('System.Id')
+        item_id = get_item_id(item)
         if item_id and int(item_id) in common_ids and not check_completeness(item):
             incomplete_ids.append(int(item_id))
 
@@ -127,9 +157,10 @@ def print_status(status):
     else:
         print("Cache is fully synced - no fetch needed!")
 
-def update_expected_ids(query_ids):
-    """Update the expected_ids in cache metadata."""
-    cache = load_cache()
+def update_expected_ids(query_ids, cache=None):
+    """Update the expected_ids in cache metadata (loading the cache if not given)."""
+    if cache is None:
+        cache = load_cache()
     cache['metadata']['expected_ids'] = sorted(query_ids)
     cache['metadata']['expected_count'] = len(query_ids)
     cache['metadata']['last_query_sync'] = datetime.now().isoformat()
@@ -139,13 +170,15 @@ def update_expected_ids(query_ids):
 def remove_stale_items(query_ids):
     """Remove items from cache that are no longer in queries."""
     cache = load_cache()
-    query_id_set = set(query_ids)
+    query_id_set = set(map(int, query_ids))
 
     original_count = len(cache.get('work_items', []))
-    cache['work_items'] = [
-        item for item in cache.get('work_items', [])
-        if (item.get('id') or item.get('fields', {}).get('System.Id')) in query_id_set
-    ]
+    kept = []
+    for item in cache.get('work_items', []):
+        item_id = get_item_id(item)
+        if item_id and int(item_id) in query_id_set:
+            kept.append(item)
+    cache['work_items'] = kept
     new_count = len(cache['work_items'])
 
     removed = original_count - new_count
@@ -165,11 +198,14 @@ def main():
 
     args = parser.parse_args()
 
+    # Fold in batches from save_to_cache.py --append before reading or cleaning
+    compact_cache(quiet=True)
+
     if args.status:
         cache = load_cache()
         expected = cache.get('metadata', {}).get('expected_ids', [])
         if expected:
-            status = check_sync_status(expected)
+            status = check_sync_status(expected, cache)
             if args.json:
                 print(json.dumps(status, indent=2))
             else:
@@ -179,11 +215,10 @@ def main():
         return
 
     if args.check:
-        with open(args.check, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        query_ids = data if isinstance(data, list) else data.get('ids', [])
+        query_ids = read_ids(args.check)
+        cache = load_cache()
 
-        status = check_sync_status(query_ids)
+        status = check_sync_status(query_ids, cache)
 
         if args.json:
             print(json.dumps(status, indent=2))
@@ -191,20 +226,16 @@ def main():
             print_status(status)
 
         # Also update expected IDs
-        update_expected_ids(query_ids)
+        update_expected_ids(query_ids, cache)
         return
 
     if args.update_ids:
-        with open(args.update_ids, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        query_ids = data if isinstance(data, list) else data.get('ids', [])
+        query_ids = read_ids(args.update_ids)
         update_expected_ids(query_ids)
         return
 
     if args.clean:
-        with open(args.clean, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        query_ids = data if isinstance(data, list) else data.get('ids', [])
+        query_ids = read_ids(args.clean)
         remove_stale_items(query_ids)
         return
 